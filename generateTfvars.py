@@ -8,468 +8,470 @@ infrastructure. Script helps automate the process, faster the infrastructure cre
 the chances of manual errors.
 """
 
-import csv
+import datetime
+import functools
 import json
 import os
+import pickle
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 import openpyxl
-import io
-
-
-def getCsvdata(sheet):
-    # Create a temporary CSV file-like object for the sheet
-    csv_data = io.StringIO()
-    writer = csv.writer(csv_data)
-    # Write each row to the CSV data object
-    for row in sheet.iter_rows(values_only=True):
-        writer.writerow(row)
-    return csv_data
-
-
-def generateFinalTfvarsFile(intermediate_tfvars_file, final_tfvars_file):
-    # Read intermediate tfvars file
-    with open(intermediate_tfvars_file, "r") as input_file:
-        lines = input_file.readlines()
-    # Write final route table tfvars file
-    output_lines = []
-    for line in lines:
-        # Use a loop to find and replace the first two occurrences of double quotes
-        if '\\"' in line:
-            # for CIDRs
-            new_line = line.replace('\\"', '', 2)
-        else:
-            new_line = line.replace('"', '', 2)
-        new_line = new_line.replace(':', ' =', 1)
 
+try:
+    # python-calamine parses xlsx in native code, openpyxl is used when it is not installed
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+# Workbook.close() needs python-calamine 0.3.0 or newer, older versions fall back to openpyxl
+if CalamineWorkbook is not None and not hasattr(CalamineWorkbook, 'close'):
+    CalamineWorkbook = None
+
+
+def getSheetNames(file_path):
+    if CalamineWorkbook is not None:
+        workbook = CalamineWorkbook.from_path(file_path)
+        try:
+            return workbook.sheet_names
+        finally:
+            workbook.close()
+    workbook = openpyxl.load_workbook(file_path, data_only=True, read_only=True)
+    sheet_names = workbook.sheetnames
+    workbook.close()
+    return sheet_names
+
+
+def getColumnCount(headers):
+    # Count the columns up to the last named one, the cells after it are empty padding
+    return max((index + 1 for index, header in enumerate(headers) if header not in (None, '')), default=1)
+
+
+def iterSheetRows(file_path, sheet_name):
+    # Yield the cell values of every row of the sheet, header row first
+    if CalamineWorkbook is not None:
+        workbook = CalamineWorkbook.from_path(file_path)
+        try:
+            yield from workbook.get_sheet_by_name(sheet_name).iter_rows()
+        finally:
+            workbook.close()
+        return
+    workbook = openpyxl.load_workbook(file_path, data_only=True, read_only=True)
+    try:
+        sheet = workbook[sheet_name]
+        # Generated workbooks may declare a wrong dimension (often A1:A1), which read-only
+        # mode trusts. Read to the end of the sheet data instead, the columns are bounded below
+        sheet.reset_dimensions()
+        headers = next(sheet.iter_rows(max_row=1, values_only=True), None)
+        # An empty sheet has no header row and no data
+        if headers is None:
+            return
+        yield headers
+        yield from sheet.iter_rows(min_row=2, max_col=getColumnCount(headers), values_only=True)
+    finally:
+        workbook.close()
+
+
+def getCellValue(value):
+    # Keep cell values as strings, empty cells as ''. calamine reads whole numbers as floats
+    # and date cells as dates, where openpyxl reads datetimes at midnight
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime.datetime) and value.time() == datetime.time():
+        return value.date().isoformat()
+    return str(value)
+
+
+def getSheetRows(sheet_rows, name_header):
+    # Return the column index of every header and a stream of the data rows,
+    # or (None, None) for an empty sheet without a header row
+    headers = next(sheet_rows, None)
+    if headers is None:
+        return None, None
+    max_col = getColumnCount(headers)
+    column_index = {header: index for index, header in enumerate(headers[:max_col])}
+    name_index = column_index[name_header]
+    # Skip rows without a name
+    return column_index, ([getCellValue(value) for value in row[:max_col]]
+                          for row in sheet_rows if row[name_index] not in (None, ''))
+
+
+# Output and cache paths of a sheet, the directories are joined once
+OUTPUT_FILE_FORMAT = os.path.join('output', 'final-{}.tfvars').format
+CACHE_FILE_FORMAT = os.path.join('cache', '{}.pkl').format
+# Buffer size of the files written and read back, so pickle frames do not each cost a syscall
+FILE_BUFFER_SIZE = 1 << 20
+
+
+def generateFileName(sheet_name):
+    # Form output file
+    return OUTPUT_FILE_FORMAT(sheet_name)
+
+
+def generateCacheFileName(sheet_name):
+    # Form cache file of parsed sheet
+    return CACHE_FILE_FORMAT(sheet_name)
+
+
+def loadCachedResource(cache_file, cache_key):
+    # Return the sheet resources parsed on an earlier run, if the workbook is unchanged.
+    # A missing or unreadable cache file is a cache miss
+    try:
+        with open(cache_file, 'rb', buffering=FILE_BUFFER_SIZE) as cache:
+            cached_key, resource = pickle.load(cache)
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+        return None
+    if cached_key != cache_key:
+        return None
+    return resource
+
+
+def saveCachedResource(cache_file, cache_key, resource):
+    # Write a temporary file next to the cache file and move it into place,
+    # so an interrupted run never leaves a truncated cache file behind
+    cache_fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(cache_file), suffix='.tmp')
+    try:
+        with open(cache_fd, 'wb', buffering=FILE_BUFFER_SIZE) as cache:
+            pickle.dump((cache_key, resource), cache, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, cache_file)
+    except BaseException:
+        os.remove(temp_file)
+        raise
 
-        # Remove trailing comma. Don't remove comma of multiple items
-        if '},' not in new_line:
-            new_line = new_line.rstrip(',\n') + '\n'
-        output_lines.append(new_line)
-    # Write the modified content to the output file
-    with open(final_tfvars_file, "w") as output_file:
-        output_file.writelines(output_lines)
-    print(f'=>>> Completed generating final tfvars file {final_tfvars_file}')
 
+def getValue(value):
+    return value
 
-def generateFileNames(sheet_name):
-    # Form intermediate and output files
-    json_file = os.path.join('intermediate', sheet_name + '.json')
-    intermediate_tfvars_file = os.path.join('intermediate', sheet_name + '.tfvars')
-    final_tfvars_file = os.path.join('output', 'final-' + sheet_name + '.tfvars')
-    return json_file, intermediate_tfvars_file, final_tfvars_file
 
+# Boolean cells are read case-insensitively, an empty cell is false
+BOOL_MAP = {'true': True, 'false': False}
 
-def getCidrArray(header, row):
-    cidr_blocks = []
-    cidr_items = row[header].split(',')
-    try:
-        for cidr_item in cidr_items:
-            cidr_blocks.append(f'"{cidr_item}"')
-    except ValueError:
-        pass
-    return cidr_blocks
+
+def getBoolean(value):
+    boolean_key = value.strip().lower()
+    if not boolean_key:
+        return False
+    if boolean_key not in BOOL_MAP:
+        raise ValueError(f'Expected true or false, got {value!r}')
+    return BOOL_MAP[boolean_key]
+
+
+def getLowerValue(value):
+    return value.lower()
+
+
+def getIntValue(value):
+    return int(value)
+
+
+def getListValue(value):
+    # Items may be typed with their own quotes in the sheet
+    return [item.strip('"') for item in value.split(',')]
 
 
-def getRulesArray(header, row):
+def getCidrArray(value):
+    # Blanks around the commas and empty items are dropped
+    cidr_items = (cidr_item.strip() for cidr_item in value.split(','))
+    return [cidr_item for cidr_item in cidr_items if cidr_item]
+
+
+# Rule and tag cells repeat across rows, parse every distinct cell once.
+# The memoized values are kept private, getRulesArray and getTags hand out copies.
+@functools.lru_cache(maxsize=4096)
+def parseRulesArray(rules):
+    if not rules:
+        return []
     route_rules_array = []
-    route_rules_items = row[header].split(',')
 
-    try:
-        for route_rules_item in route_rules_items:
-            route_rule = {}
-            route_rules_key_pairs = route_rules_item.split(';')
-            options_array = []
-
-            for pair in route_rules_key_pairs:
-                key, value = pair.split("=")
-                if key != "options":
-                    route_rule[key] = value
-                else:
-                    options_object = {}
+    for route_rules_item in rules.split(','):
+        # Skip the empty item left by a trailing comma
+        if not route_rules_item:
+            continue
+        route_rule = {}
+        options_array = []
+
+        for pair in route_rules_item.split(';'):
+            if not pair:
+                continue
+            key, separator, value = pair.partition("=")
+            if not separator:
+                raise ValueError(f'Missing "=" in rule {pair!r}')
+            if key != "options":
+                route_rule[key] = value
+            else:
+                protocol, separator, options_key_pairs = value.partition('::')
+                if not separator:
+                    raise ValueError(f'Missing "::" in options {value!r}')
+                # A single option has no "||", every option pair is read
+                if options_key_pairs:
                     option_rule = {}
-                    protocol, options_key_pairs = value.split('::')
-                    if options_key_pairs != '' and '||' in options_key_pairs:
-                        options = options_key_pairs.split("||")
-                        for option in options:
-                            optionKey, optionVal = option.split("<>")
-                            option_rule[optionKey] = optionVal
-                        options_array.append(option_rule)
-                    options_object[protocol] = options_array
-                    route_rule[key] = options_object
-
-            route_rules_array.append(route_rule)
-
-    except ValueError:
-        pass
+                    for option in options_key_pairs.split("||"):
+                        option_key, separator, option_value = option.partition("<>")
+                        if not separator or '<>' in option_value:
+                            raise ValueError(f'Expected one "<>" in option {option!r}')
+                        option_rule[option_key] = option_value
+                    options_array.append(option_rule)
+                route_rule[key] = {protocol: options_array}
+
+        route_rules_array.append(route_rule)
+
     return route_rules_array
 
 
-def getTags(header, row):
+@functools.lru_cache(maxsize=4096)
+def parseTags(tags_value):
+    if not tags_value:
+        return {}
     tags = {}
-    try:
-        tags_key_pairs = row[header].split(';')
-        for pair in tags_key_pairs:
-            key, value = pair.split("=")
-            tags[key] = value
-    except ValueError:
-        pass
+    for pair in tags_value.split(';'):
+        # Skip the empty pair left by a trailing semicolon
+        if not pair:
+            continue
+        key, separator, value = pair.partition("=")
+        if not separator:
+            raise ValueError(f'Missing "=" in tag {pair!r}')
+        tags[key] = value
     return tags
 
 
-def generateIntermediateFiles(json_file, intermediate_tfvars_file, sheet_name, resource):
-    # Write json file
-    with open(json_file, 'w') as jsonfile:
-        json.dump(resource, jsonfile, indent=4)
+def copyParsedValue(value):
+    # Rebuild the lists and dicts of a parsed value, the strings are immutable and shared
+    if isinstance(value, dict):
+        return {key: copyParsedValue(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copyParsedValue(item) for item in value]
+    return value
 
-    # Convert route table JSON data to tfvars format
-    tfvars_content = sheet_name + " = {\n"
-    for key, value in resource.items():
-        tfvars_content += f'"{key}": {json.dumps(value, indent=4, separators=(",", ": "))},\n'
-    tfvars_content += "}\n"
 
-    # Write intermediate .tfvars file
-    with open(intermediate_tfvars_file, "w") as tfvars_file:
-        tfvars_file.write(tfvars_content)
+def getRulesArray(rules):
+    return copyParsedValue(parseRulesArray(rules))
 
 
-def processRouteTable(sheet_name, sheet):
-    print(f'Processing sheet {sheet_name}')
-    # get intermediate and output file names
-    json_file, intermediate_tfvars_file, final_tfvars_file = generateFileNames(sheet_name)
-    # Generate csv data from excel sheet
-    csv_data = getCsvdata(sheet)
-    # Reset the CSV data object's position
-    csv_data.seek(0)
-    # Use DictReader to read and print CSV data
-    reader = csv.DictReader(csv_data)
-    route_tables = {}
-    for row in reader:
-        for header, value in row.items():
-            if header == 'route_table_name':
-                route_table_name = row['route_table_name']
-                # print(f'route_table_name : {route_table_name}')
-                route_tables[row['route_table_name']] = {}
-            elif header == 'compartment_id':
-                route_tables[row['route_table_name']]['compartment_id'] = row['compartment_id']
-            elif header == 'vcn_id':
-                route_tables[row['route_table_name']]['vcn_id'] = row['vcn_id']
-            elif header == 'display_name':
-                route_tables[row['route_table_name']]['display_name'] = row['display_name']
-            elif header == 'route_rules_drg':
-                route_rules_drg_array = getRulesArray(header, row)
-            elif header == 'route_rules_igw':
-                route_rules_igw_array = getRulesArray(header, row)
-            elif header == 'route_rules_sgw':
-                route_rules_sgw_array = getRulesArray(header, row)
-            elif header == 'route_rules_ngw':
-                route_rules_ngw_array = getRulesArray(header, row)
-            elif header == 'route_rules_lpg':
-                route_rules_lpg_array = getRulesArray(header, row)
-            elif header == 'route_rules_ip':
-                route_rules_ip_array = getRulesArray(header, row)
-            elif header == 'freeform_tags':
-                freeform_tags = getTags(header, row)
-            elif header == 'defined_tags':
-                defined_tags = getTags(header, row)
-
-        # Assign rules array objects
-        route_tables[row['route_table_name']]['route_rules_drg'] = route_rules_drg_array
-        route_tables[row['route_table_name']]['route_rules_igw'] = route_rules_igw_array
-        route_tables[row['route_table_name']]['route_rules_sgw'] = route_rules_sgw_array
-        route_tables[row['route_table_name']]['route_rules_ngw'] = route_rules_ngw_array
-        route_tables[row['route_table_name']]['route_rules_lpg'] = route_rules_lpg_array
-        route_tables[row['route_table_name']]['route_rules_ip'] = route_rules_ip_array
-        route_tables[row['route_table_name']]['freeform_tags'] = freeform_tags
-        route_tables[row['route_table_name']]['defined_tags'] = defined_tags
-
-    # generate intermediate and final files
-    generateIntermediateFiles(json_file, intermediate_tfvars_file, sheet_name, route_tables)
-    generateFinalTfvarsFile(intermediate_tfvars_file, final_tfvars_file)
-
-
-def processVcns(sheet_name, sheet):
-    print(f'Processing sheet {sheet_name}')
-    # get intermediate and output file names
-    json_file, intermediate_tfvars_file, final_tfvars_file = generateFileNames(sheet_name)
-    # Generate csv data from excel sheet
-    csv_data = getCsvdata(sheet)
-    # Reset the CSV data object's position
-    csv_data.seek(0)
-    # Use DictReader to read and print CSV data
-    reader = csv.DictReader(csv_data)
-    vcns = {}
-    for row in reader:
-        for header, value in row.items():
-            if header == 'vcn_name':
-                vcn_name = row['vcn_name']
-                # print(f'vcn_name : {vcn_name}')
-                vcns[row['vcn_name']] = {}
-            elif header == 'compartment_id':
-                vcns[row['vcn_name']]['compartment_id'] = row['compartment_id']
-            elif header == 'display_name':
-                vcns[row['vcn_name']]['display_name'] = row['display_name']
-            elif header == 'dns_label':
-                vcns[row['vcn_name']]['dns_label'] = row['dns_label']
-            elif header == 'cidr_blocks':
-                cidr_blocks = getCidrArray(header, row)
-
-        # # Assign rules array objects
-        vcns[row['vcn_name']]['cidr_blocks'] = cidr_blocks
-
-    # generate intermediate and final files
-    generateIntermediateFiles(json_file, intermediate_tfvars_file, sheet_name, vcns)
-    generateFinalTfvarsFile(intermediate_tfvars_file, final_tfvars_file)
-
-
-def processDrgAttachments(sheet_name, sheet):
-    print(f'Processing sheet {sheet_name}')
-    # get intermediate and output file names
-    json_file, intermediate_tfvars_file, final_tfvars_file = generateFileNames(sheet_name)
-    # Generate csv data from excel sheet
-    csv_data = getCsvdata(sheet)
-    # Reset the CSV data object's position
-    csv_data.seek(0)
-    # Use DictReader to read and print CSV data
-    reader = csv.DictReader(csv_data)
-    drg_attachments = {}
-    for row in reader:
-        for header, value in row.items():
-            if header == 'drg_attachment_name':
-                drg_attachment_name = row['drg_attachment_name']
-                drg_attachments[row['drg_attachment_name']] = {}
-            elif header == 'drg_id':
-                drg_attachments[row['drg_attachment_name']]['drg_id'] = row['drg_id']
-            elif header == 'display_name':
-                drg_attachments[row['drg_attachment_name']]['display_name'] = row['display_name']
-            elif header == 'drg_route_table_id':
-                drg_attachments[row['drg_attachment_name']]['drg_route_table_id'] = row['drg_route_table_id']
-            elif header == 'network_details':
-                network_details_array = getRulesArray(header, row)
-            elif header == 'vcn_id':
-                drg_attachments[row['drg_attachment_name']]['vcn_id'] = row['vcn_id']
-            elif header == 'freeform_tags':
-                freeform_tags = getTags(header, row)
-            elif header == 'defined_tags':
-                defined_tags = getTags(header, row)
-
-        # Assign rules array objects
-        drg_attachments[row['drg_attachment_name']]['network_details'] = network_details_array
-        drg_attachments[row['drg_attachment_name']]['freeform_tags'] = freeform_tags
-        drg_attachments[row['drg_attachment_name']]['defined_tags'] = defined_tags
-
-    # generate intermediate and final files
-    generateIntermediateFiles(json_file, intermediate_tfvars_file, sheet_name, drg_attachments)
-    generateFinalTfvarsFile(intermediate_tfvars_file, final_tfvars_file)
-
-
-def processSecLists(sheet_name, sheet):
-    print(f'Processing sheet {sheet_name}')
-    # get intermediate and output file names
-    json_file, intermediate_tfvars_file, final_tfvars_file = generateFileNames(sheet_name)
-    # Generate csv data from excel sheet
-    csv_data = getCsvdata(sheet)
-    # Reset the CSV data object's position
-    csv_data.seek(0)
-    # Use DictReader to read and print CSV data
-    reader = csv.DictReader(csv_data)
-    seclists = {}
-    for row in reader:
-        for header, value in row.items():
-            if header == 'seclist_name':
-                seclist_name = row['seclist_name']
-                seclists[row['seclist_name']] = {}
-            elif header == 'compartment_id':
-                seclists[row['seclist_name']]['compartment_id'] = row['compartment_id']
-            elif header == 'vcn_id':
-                seclists[row['seclist_name']]['vcn_id'] = row['vcn_id']
-            elif header == 'display_name':
-                seclists[row['seclist_name']]['display_name'] = row['display_name']
-            elif header == 'ingress_sec_rules':
-                ingress_sec_rules_array = getRulesArray(header, row)
-            elif header == 'egress_sec_rules':
-                egress_sec_rules_array = getRulesArray(header, row)
-            elif header == 'freeform_tags':
-                freeform_tags = getTags(header, row)
-            elif header == 'defined_tags':
-                defined_tags = getTags(header, row)
-
-        # Assign rules array objects
-        seclists[row['seclist_name']]['ingress_sec_rules'] = ingress_sec_rules_array
-        seclists[row['seclist_name']]['egress_sec_rules'] = egress_sec_rules_array
-        seclists[row['seclist_name']]['freeform_tags'] = freeform_tags
-        seclists[row['seclist_name']]['defined_tags'] = defined_tags
-
-    # generate intermediate and final files
-    generateIntermediateFiles(json_file, intermediate_tfvars_file, sheet_name, seclists)
-    generateFinalTfvarsFile(intermediate_tfvars_file, final_tfvars_file)
-
-
-#adding function for subnets
-def processSubnets(sheet_name, sheet):
-    print(f'Processing sheet {sheet_name}')
-    # get intermediate and output file names
-    json_file, intermediate_tfvars_file, final_tfvars_file = generateFileNames(sheet_name)
-    # Generate csv data from excel sheet
-    csv_data = getCsvdata(sheet)
-    # Reset the CSV data object's position
-    csv_data.seek(0)
-    # Use DictReader to read and print CSV data
-    reader = csv.DictReader(csv_data)
-    subnets = {}
-    for row in reader:
-        for header, value in row.items():
-            if header == 'subnet_name':
-                subnet_name = row['subnet_name']
-                subnets[row['subnet_name']] = {}
-            elif header == 'availability_domain':
-                subnets[row['subnet_name']]['availability_domain'] = row['availability_domain']
-            elif header == 'cidr_block':
-                subnets[row['subnet_name']]['cidr_block'] = row['cidr_block']
-            elif header == 'compartment_id':
-                subnets[row['subnet_name']]['compartment_id'] = row['compartment_id']
-            elif header == 'vcn_id':
-                subnets[row['subnet_name']]['vcn_id'] = row['vcn_id']
-            elif header == 'display_name':
-                subnets[row['subnet_name']]['display_name'] = row['display_name']
-            elif header == 'prohibit_public_ip_on_vnic':
-                subnets[row['subnet_name']]['prohibit_public_ip_on_vnic'] = row['prohibit_public_ip_on_vnic'].lower()
-            elif header == 'route_table_id':
-                subnets[row['subnet_name']]['route_table_id'] = row['route_table_id']
-            elif header == 'dns_label':
-                subnets[row['subnet_name']]['dns_label'] = row['dns_label']
-            elif header == 'dhcp_options_id':
-                subnets[row['subnet_name']]['dhcp_options_id'] = row['dhcp_options_id']
-            elif header == 'security_list_ids':
-                security_list_ids = row['security_list_ids'].split(',')
-                subnets[row['subnet_name']]['security_list_ids'] = security_list_ids
-            elif header == 'freeform_tags':
-                freeform_tags = getTags(header, row)
-            elif header == 'defined_tags':
-                defined_tags = getTags(header, row)
-
-        # Assign rules array objects
-        subnets[row['subnet_name']]['freeform_tags'] = freeform_tags
-        subnets[row['subnet_name']]['defined_tags'] = defined_tags
-
-    # generate intermediate and final files
-    generateIntermediateFiles(json_file, intermediate_tfvars_file, sheet_name, subnets)
-    generateFinalTfvarsFile(intermediate_tfvars_file, final_tfvars_file)
-
-#Function for Virtual Machine tfvars file
-def processInstances(sheet_name, sheet):
-    print(f'Processing sheet {sheet_name}')
-    # get intermediate and output file names
-    json_file, intermediate_tfvars_file, final_tfvars_file = generateFileNames(sheet_name)
-    # Generate csv data from excel sheet
-    csv_data = getCsvdata(sheet)
-    # Reset the CSV data object's position
-    csv_data.seek(0)
-    # Use DictReader to read and print CSV data
-    reader = csv.DictReader(csv_data)
-    instances = {}
-
-    for row in reader:
-        for header, value in row.items():
-            if header == 'instance_name':
-                instance_name = row['instance_name']
-                instances[row['instance_name']] = {}
-            elif header == 'availability_domain':
-                instances[row['instance_name']]['availability_domain'] = int(row['availability_domain'])
-            elif header == 'compartment_id':
-                instances[row['instance_name']]['compartment_id'] = row['compartment_id']
-            elif header == 'shape':
-                instances[row['instance_name']]['shape'] = row['shape']
-            elif header == 'display_name':
-                instances[row['instance_name']]['display_name'] = row['display_name']
-            elif header == 'boot_volume_size_in_gbs':
-                instances[row['instance_name']]['boot_volume_size_in_gbs'] = int(row['boot_volume_size_in_gbs'])
-            elif header == 'fault_domain':
-                instances[row['instance_name']]['fault_domain'] = row['fault_domain']
-            elif header == 'source_id':
-                instances[row['instance_name']]['source_id'] = row['source_id']
-            elif header == 'source_type':
-                instances[row['instance_name']]['source_type'] = row['source_type']
-            elif header == 'network_compartment_id':
-                instances[row['instance_name']]['network_compartment_id'] = row['network_compartment_id']
-            elif header == 'vcn_compartment_id':
-                instances[row['instance_name']]['vcn_compartment_id'] = row['vcn_compartment_id']
-            elif header == 'vcn_name':
-                instances[row['instance_name']]['vcn_name'] = row['vcn_name']
-            elif header == 'subnet_id':
-                instances[row['instance_name']]['subnet_id'] = row['subnet_id']
-            elif header == 'assign_public_ip':
-                if row['assign_public_ip'].lower() == "true":
-                    boolean_value = True
-                elif row['assign_public_ip'].lower().lower() == "false":
-                    boolean_value = False
-                instances[row['instance_name']]['assign_public_ip'] = boolean_value
-            elif header == 'private_ip':
-                instances[row['instance_name']]['private_ip'] = row['private_ip']
-            elif header == 'ocpus':
-                instances[row['instance_name']]['ocpus'] = row['ocpus']
-            elif header == 'memory_in_gbs':
-                instances[row['instance_name']]['memory_in_gbs'] = int(row['memory_in_gbs'])
-            elif header == 'update_is_pv_encryption_in_transit_enabled':
-                if row['update_is_pv_encryption_in_transit_enabled'].lower() == "true":
-                    boolean_value = True
-                elif row['update_is_pv_encryption_in_transit_enabled'].lower().lower() == "false":
-                    boolean_value = False
-                instances[row['instance_name']]['update_is_pv_encryption_in_transit_enabled'] = boolean_value
-            elif header == 'freeform_tags':
-                freeform_tags = getTags(header, row)
-            elif header == 'defined_tags':
-                defined_tags = getTags(header, row)
-
-        # Assign rules array objects
-        instances[row['instance_name']]['freeform_tags'] = freeform_tags
-        instances[row['instance_name']]['defined_tags'] = defined_tags
-
-        # generate intermediate and final files
-        generateIntermediateFiles(json_file, intermediate_tfvars_file, sheet_name, instances)
-        generateFinalTfvarsFile(intermediate_tfvars_file, final_tfvars_file)
+def getTags(tags_value):
+    return dict(parseTags(tags_value))
 
 
+# Parsers for the columns of every sheet, in the order they are written to tfvars
+ROUTE_TABLE_PARSERS = {
+    'compartment_id': getValue,
+    'vcn_id': getValue,
+    'display_name': getValue,
+    'route_rules_drg': getRulesArray,
+    'route_rules_igw': getRulesArray,
+    'route_rules_sgw': getRulesArray,
+    'route_rules_ngw': getRulesArray,
+    'route_rules_lpg': getRulesArray,
+    'route_rules_ip': getRulesArray,
+    'freeform_tags': getTags,
+    'defined_tags': getTags,
+}
 
+VCN_PARSERS = {
+    'compartment_id': getValue,
+    'display_name': getValue,
+    'dns_label': getValue,
+    'cidr_blocks': getCidrArray,
+}
 
-###################################################################################################
-#####                                generarteTfvars,py script                                #####
-###################################################################################################
+DRG_ATTACHMENT_PARSERS = {
+    'drg_id': getValue,
+    'display_name': getValue,
+    'drg_route_table_id': getValue,
+    'vcn_id': getValue,
+    'network_details': getRulesArray,
+    'freeform_tags': getTags,
+    'defined_tags': getTags,
+}
 
-myTfAutomationDir = "C:/workdir/PycharmProjects/Tutorials/tf-automation"
-os.chdir(myTfAutomationDir)
-current_directory = os.getcwd()
-print(f'current_directory : {current_directory}')
-intermediate_dir = os.path.join(current_directory, 'intermediate')
-output_dir = os.path.join(current_directory, 'output')
-if not os.path.exists(intermediate_dir):
-    os.makedirs(intermediate_dir)
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
-
-
-# Create a dictionary mapping sheet names to functions
-sheet_function_mapping = {
-    'route_tables': processRouteTable,
-    'vcns': processVcns,
-    'drg_attachments': processDrgAttachments,
-    'seclists': processSecLists,
-    'subnets': processSubnets,
-    'instances': processInstances,
+SECLIST_PARSERS = {
+    'compartment_id': getValue,
+    'vcn_id': getValue,
+    'display_name': getValue,
+    'ingress_sec_rules': getRulesArray,
+    'egress_sec_rules': getRulesArray,
+    'freeform_tags': getTags,
+    'defined_tags': getTags,
 }
 
-# Open the Excel file
-file_path = 'input.xlsx'
-workbook = openpyxl.load_workbook(file_path, data_only=True)
+SUBNET_PARSERS = {
+    'availability_domain': getValue,
+    'cidr_block': getValue,
+    'compartment_id': getValue,
+    'vcn_id': getValue,
+    'display_name': getValue,
+    'prohibit_public_ip_on_vnic': getLowerValue,
+    'route_table_id': getValue,
+    'dns_label': getValue,
+    'dhcp_options_id': getValue,
+    'security_list_ids': getListValue,
+    'freeform_tags': getTags,
+    'defined_tags': getTags,
+}
 
-# Iterate through each sheet in the workbook
-for sheet_name in workbook.sheetnames:
-    if sheet_name in sheet_function_mapping:
-        sheet_function = sheet_function_mapping[sheet_name]
-        sheet = workbook[sheet_name]
-        sheet_function(sheet_name, sheet)
+INSTANCE_PARSERS = {
+    'availability_domain': getIntValue,
+    'compartment_id': getValue,
+    'shape': getValue,
+    'display_name': getValue,
+    'boot_volume_size_in_gbs': getIntValue,
+    'fault_domain': getValue,
+    'source_id': getValue,
+    'source_type': getValue,
+    'network_compartment_id': getValue,
+    'vcn_compartment_id': getValue,
+    'vcn_name': getValue,
+    'subnet_id': getValue,
+    'assign_public_ip': getBoolean,
+    'private_ip': getValue,
+    'ocpus': getValue,
+    'memory_in_gbs': getIntValue,
+    'update_is_pv_encryption_in_transit_enabled': getBoolean,
+    'freeform_tags': getTags,
+    'defined_tags': getTags,
+}
+
+# Name column and column parsers of every known sheet
+SHEET_SCHEMAS = {
+    'route_tables': {'key': 'route_table_name', 'parsers': ROUTE_TABLE_PARSERS},
+    'vcns': {'key': 'vcn_name', 'parsers': VCN_PARSERS},
+    'drg_attachments': {'key': 'drg_attachment_name', 'parsers': DRG_ATTACHMENT_PARSERS},
+    'seclists': {'key': 'seclist_name', 'parsers': SECLIST_PARSERS},
+    'subnets': {'key': 'subnet_name', 'parsers': SUBNET_PARSERS},
+    'instances': {'key': 'instance_name', 'parsers': INSTANCE_PARSERS},
+}
+
+
+def getColumnParsers(parsers, column_index):
+    # Resolve the column of every known header present in the sheet once
+    return [(header, column_index[header], parse) for header, parse in parsers.items() if header in column_index]
+
+
+def parseRow(column_parsers, row, sheet_name, name):
+    # Run the parser of every known column on the row, naming the sheet, row and cell that fails to parse
+    entry = {}
+    for header, index, parse in column_parsers:
+        try:
+            entry[header] = parse(row[index])
+        except ValueError as error:
+            raise ValueError(f'Invalid {header} value {row[index]!r} of {name!r} in sheet {sheet_name}: '
+                             f'{error}') from error
+    return entry
+
+
+# Quote strings the way json.dumps does, without going through the encoder per value
+quoteString = json.encoder.encode_basestring_ascii
+
+
+def addTfvarsValue(tfvars_parts, value, indent):
+    # Add a parsed value in tfvars syntax, nested blocks are indented by 4 spaces
+    if isinstance(value, bool):
+        tfvars_parts.append('true' if value else 'false')
+    elif isinstance(value, str):
+        tfvars_parts.append(quoteString(value))
+    elif isinstance(value, dict):
+        if not value:
+            tfvars_parts.append('{}')
+            return
+        tfvars_parts.append('{\n')
+        for key, item in value.items():
+            tfvars_parts.append(f'{indent}    {key} = ')
+            addTfvarsValue(tfvars_parts, item, indent + '    ')
+            tfvars_parts.append('\n')
+        tfvars_parts.append(indent + '}')
+    elif isinstance(value, list):
+        if not value:
+            tfvars_parts.append('[]')
+            return
+        tfvars_parts.append('[\n')
+        for index, item in enumerate(value):
+            tfvars_parts.append(indent + '    ')
+            addTfvarsValue(tfvars_parts, item, indent + '    ')
+            tfvars_parts.append(',\n' if index < len(value) - 1 else '\n')
+        tfvars_parts.append(indent + ']')
     else:
-        print(f"No function found for sheet: {sheet_name}")
+        tfvars_parts.append(str(value))
 
 
-# Close the Excel file
-workbook.close()
\ No newline at end of file
+def generateTfvarsFile(final_tfvars_file, sheet_name, resource):
+    # Build the tfvars content of the sheet and write it with a single call
+    tfvars_parts = [sheet_name + " = {\n"]
+    for key, value in resource.items():
+        tfvars_parts.append(f'{key} = ')
+        addTfvarsValue(tfvars_parts, value, '')
+        tfvars_parts.append('\n')
+    tfvars_parts.append("}\n")
+    with open(final_tfvars_file, "w", buffering=FILE_BUFFER_SIZE) as tfvars_file:
+        tfvars_file.write("".join(tfvars_parts))
+    print(f'=>>> Completed generating final tfvars file {final_tfvars_file}')
+
+
+def processSheet(sheet_name, sheet_rows):
+    print(f'Processing sheet {sheet_name}')
+    schema = SHEET_SCHEMAS[sheet_name]
+    # Stream rows from excel sheet
+    column_index, rows = getSheetRows(sheet_rows, schema['key'])
+    if column_index is None:
+        return {}
+    column_parsers = getColumnParsers(schema['parsers'], column_index)
+    name_index = column_index[schema['key']]
+    resource = {}
+    for row in rows:
+        name = row[name_index]
+        resource[name] = parseRow(column_parsers, row, sheet_name, name)
+    return resource
+
+
+def processWorkbookSheet(file_path, sheet_name, cache_key, base_dir):
+    # Runs in a worker process, so the workbook is opened again for the sheet.
+    # The output and cache files are written under base_dir
+    cache_file = os.path.join(base_dir, generateCacheFileName(sheet_name))
+    resource = loadCachedResource(cache_file, cache_key)
+    if resource is None:
+        resource = processSheet(sheet_name, iterSheetRows(file_path, sheet_name))
+        saveCachedResource(cache_file, cache_key, resource)
+    else:
+        print(f'Using cached sheet {sheet_name}')
+    generateTfvarsFile(os.path.join(base_dir, generateFileName(sheet_name)), sheet_name, resource)
+
+
+def main(file_path='input.xlsx', workdir=None):
+    # Generate the tfvars of every known sheet of file_path. Relative paths are resolved in workdir,
+    # the working directory of the process is left unchanged so main can be called repeatedly
+    base_dir = os.path.abspath(workdir if workdir is not None else os.getcwd())
+    file_path = os.path.join(base_dir, file_path)
+    print(f'current_directory : {base_dir}')
+    output_dir = os.path.join(base_dir, 'output')
+    cache_dir = os.path.join(base_dir, 'cache')
+    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Find the sheets of the Excel file, every worker opens it again for its sheet
+    sheet_names = getSheetNames(file_path)
+    # Parsed sheets are reused until the workbook, this script or the Excel reader changes
+    excel_reader = 'calamine' if CalamineWorkbook is not None else 'openpyxl'
+    cache_key = (os.path.abspath(file_path), os.path.getmtime(file_path), os.path.getmtime(__file__), excel_reader)
+
+    # Process the sheets of the workbook in parallel, each sheet writes its own files
+    mapped_sheet_names = []
+    for sheet_name in sheet_names:
+        if sheet_name in SHEET_SCHEMAS:
+            mapped_sheet_names.append(sheet_name)
+        else:
+            print(f"No function found for sheet: {sheet_name}")
+    with ProcessPoolExecutor(max_workers=len(SHEET_SCHEMAS)) as executor:
+        futures = [executor.submit(processWorkbookSheet, file_path, sheet_name, cache_key, base_dir)
+                   for sheet_name in mapped_sheet_names]
+        for future in futures:
+            # Raise any error of the worker
+            future.result()
+
+
+###################################################################################################
+#####                                generarteTfvars,py script                                #####
+###################################################################################################
+
+if __name__ == '__main__':
+    # Usage: python generateTfvars.py [input.xlsx [workdir]]
+    main(sys.argv[1] if len(sys.argv) > 1 else 'input.xlsx', sys.argv[2] if len(sys.argv) > 2 else None)